@@ -1,8 +1,12 @@
 import argparse
 import os
 import csv
+import re
+import time
+import zlib
 from twisted.internet import reactor, protocol
 from twisted.mail import imap4
+from twisted.python import log
 from twisted.cred import portal, credentials, error
 from twisted.internet.defer import succeed, fail
 from twisted.cred.checkers import ICredentialsChecker
@@ -260,8 +264,11 @@ class IMAPMessage:
         msg = message_from_bytes(self.content)
         body_bytes = msg.get_payload(decode=True) or b''
         body_str = body_bytes.decode(msg.get_content_charset('utf-8'), errors='replace')
-        headers = self.content.split(b"\n\n", 1)[0]
-        return BytesIO(headers + b"\n\n" + body_str.encode('utf-8'))
+        separator = re.search(rb"\r?\n\r?\n", self.content)
+        if separator is None:
+            return BytesIO(self.content)
+        headers = self.content[:separator.end()]
+        return BytesIO(headers + body_str.encode('utf-8'))
 
     def getFlags(self):
         """
@@ -319,25 +326,189 @@ class IMAPUserRealm:
 
 
 
+class DeflateTransport:
+    def __init__(self, transport, level):
+        """
+        Envuelve el transporte de la conexión para comprimir y descomprimir con DEFLATE (RFC 4978).
+        Entradas: transport (transporte original), level (nivel de compresión de zlib)
+        Salidas: Ninguna
+        """
+        self.transport = transport
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+        self.decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+        self.pendingFlush = None
+        self.bytesIn = 0
+        self.wireIn = 0
+        self.bytesOut = 0
+        self.wireOut = 0
+        self.cpuTime = 0.0
+
+    def __getattr__(self, name):
+        """
+        Delega al transporte original los atributos que no se redefinen aquí.
+        Entradas: name (nombre del atributo)
+        Salidas: el atributo del transporte original
+        """
+        return getattr(self.transport, name)
+
+    def write(self, data):
+        """
+        Agrega datos al flujo comprimido; el vaciado se agrupa una vez por iteración del reactor.
+        Entradas: data (bytes a enviar)
+        Salidas: Ninguna
+        """
+        start = time.process_time()
+        compressed = self.compressor.compress(data)
+        self.cpuTime += time.process_time() - start
+        self.bytesOut += len(data)
+        if compressed:
+            self.wireOut += len(compressed)
+            self.transport.write(compressed)
+        if self.pendingFlush is None:
+            self.pendingFlush = reactor.callLater(0, self.flush)
+
+    def writeSequence(self, data):
+        """
+        Envía una secuencia de bloques de bytes comprimidos.
+        Entradas: data (lista de bytes)
+        Salidas: Ninguna
+        """
+        self.write(b"".join(data))
+
+    def flush(self):
+        """
+        Vacía el compresor con Z_SYNC_FLUSH para que el cliente reciba todo lo escrito.
+        Entradas: Ninguna
+        Salidas: Ninguna
+        """
+        if self.pendingFlush is not None and self.pendingFlush.active():
+            self.pendingFlush.cancel()
+        self.pendingFlush = None
+        start = time.process_time()
+        compressed = self.compressor.flush(zlib.Z_SYNC_FLUSH)
+        self.cpuTime += time.process_time() - start
+        self.wireOut += len(compressed)
+        self.transport.write(compressed)
+
+    def decompress(self, data, maxLength):
+        """
+        Descomprime los datos recibidos del cliente, sin producir más de maxLength bytes por llamada.
+        Entradas: data (bytes comprimidos), maxLength (máximo de bytes descomprimidos)
+        Salidas: bytes descomprimidos y los bytes comprimidos que quedan por procesar
+        """
+        start = time.process_time()
+        plain = self.decompressor.decompress(data, maxLength)
+        self.cpuTime += time.process_time() - start
+        tail = self.decompressor.unconsumed_tail
+        self.wireIn += len(data) - len(tail)
+        self.bytesIn += len(plain)
+        return plain, tail
+
+    def loseConnection(self):
+        """
+        Envía lo pendiente en el compresor y cierra la conexión.
+        Entradas: Ninguna
+        Salidas: Ninguna
+        """
+        if self.pendingFlush is not None:
+            self.flush()
+        self.transport.loseConnection()
+
+
 class IMAPServerProtocol(imap4.IMAP4Server):
-    def __init__(self, portal):
+    def __init__(self, portal, compressLevel=zlib.Z_DEFAULT_COMPRESSION, compressStats=False):
         """
         Inicializa el protocolo IMAP asignando el portal.
-        Entradas: portal
+        Entradas: portal, compressLevel (nivel de compresión para COMPRESS=DEFLATE),
+                  compressStats (si se muestran las estadísticas de compresión al cerrar la sesión)
         Salidas: Ninguna
         """
         super().__init__()
         self.portal = portal
+        self.compressLevel = compressLevel
+        self.compressStats = compressStats
+        self.deflate = None
+
+    def capabilities(self):
+        """
+        Retorna las capacidades del servidor, agregando COMPRESS=DEFLATE.
+        Entradas: Ninguna
+        Salidas: diccionario con las capacidades
+        """
+        cap = super().capabilities()
+        if self.deflate is None:
+            cap[b"COMPRESS"] = [b"DEFLATE"]
+        return cap
+
+    def do_COMPRESS(self, tag, mechanism):
+        """
+        Activa la compresión DEFLATE en ambos sentidos después de responder OK.
+        Entradas: tag (etiqueta del comando), mechanism (mecanismo solicitado)
+        Salidas: Ninguna
+        """
+        if mechanism.upper() != b"DEFLATE":
+            self.sendBadResponse(tag, b"Unsupported compression mechanism")
+        elif self.deflate is not None:
+            self.sendNegativeResponse(tag, b"[COMPRESSIONACTIVE] DEFLATE already active")
+        else:
+            self.sendPositiveResponse(tag, b"DEFLATE active")
+            self.deflate = DeflateTransport(self.transport, self.compressLevel)
+            self.transport = self.deflate
+
+    auth_COMPRESS = (do_COMPRESS, imap4.IMAP4Server.arg_atom)
+    select_COMPRESS = auth_COMPRESS
+
+    def dataReceived(self, data):
+        """
+        Descomprime los datos recibidos si la compresión está activa.
+        Entradas: data (bytes recibidos del socket)
+        Salidas: Ninguna
+        """
+        if self.deflate is None:
+            super().dataReceived(data)
+            return
+        try:
+            while not self.transport.disconnecting:
+                plain, data = self.deflate.decompress(data, self.MAX_LENGTH)
+                if plain:
+                    super().dataReceived(plain)
+                # Si se llenó maxLength puede quedar salida pendiente aunque no quede entrada.
+                if not data and len(plain) < self.MAX_LENGTH:
+                    break
+        except zlib.error as e:
+            log.msg(f"Datos comprimidos inválidos del cliente: {e}")
+            self.sendUntaggedResponse(b"BYE Invalid compressed data")
+            self.transport.loseConnection()
+
+    def connectionLost(self, reason):
+        """
+        Restaura el transporte original y, si se pidió, muestra las estadísticas de compresión de la sesión.
+        Entradas: reason (razón del cierre)
+        Salidas: Ninguna
+        """
+        if self.deflate is not None:
+            d = self.deflate
+            if self.compressStats:
+                print(f"Sesión IMAP con DEFLATE: enviados {d.bytesOut} bytes ({d.wireOut} en la red), "
+                      f"recibidos {d.bytesIn} bytes ({d.wireIn} en la red), "
+                      f"CPU de compresión {d.cpuTime * 1000:.2f} ms", flush=True)
+            if d.pendingFlush is not None and d.pendingFlush.active():
+                d.pendingFlush.cancel()
+            self.transport = d.transport
+        super().connectionLost(reason)
 
 
 class IMAPServerFactory(protocol.Factory):
-    def __init__(self, portal):
+    def __init__(self, portal, compressLevel=zlib.Z_DEFAULT_COMPRESSION, compressStats=False):
         """
         Inicializa Faatory con el portal de autenticación.
-        Entradas: portal
+        Entradas: portal, compressLevel (nivel de compresión para COMPRESS=DEFLATE),
+                  compressStats (si se muestran las estadísticas de compresión)
         Salidas: Ninguna
         """
         self.portal = portal
+        self.compressLevel = compressLevel
+        self.compressStats = compressStats
 
     def buildProtocol(self, addr):
         """
@@ -345,7 +516,7 @@ class IMAPServerFactory(protocol.Factory):
         Entradas: addr (dirección del cliente)
         Salidas: una instancia de IMAPServerProtocol
         """
-        return IMAPServerProtocol(self.portal)
+        return IMAPServerProtocol(self.portal, self.compressLevel, self.compressStats)
 
 
 def main():
@@ -357,13 +528,18 @@ def main():
     parser = argparse.ArgumentParser(description="Servidor IMAP basado en archivos locales.")
     parser.add_argument("-s", "--storage", required=True, help="Ruta del almacenamiento de correos.")
     parser.add_argument("-p", "--port", type=int, required=True, help="Puerto donde correrá el servidor IMAP.")
+    parser.add_argument("-z", "--compress-level", type=int, default=zlib.Z_DEFAULT_COMPRESSION,
+                        choices=range(-1, 10), metavar="{-1..9}",
+                        help="Nivel de compresión para COMPRESS=DEFLATE (default: -1, el de zlib).")
+    parser.add_argument("--compress-stats", action="store_true",
+                        help="Muestra los bytes en la red y el CPU de compresión de cada sesión con DEFLATE.")
     args = parser.parse_args()
 
     checker = CredentialsCheckerCSV(UsersPathCSV)
     realm = IMAPUserRealm(args.storage)
     p = portal.Portal(realm, [checker])
 
-    factory = IMAPServerFactory(p)
+    factory = IMAPServerFactory(p, args.compress_level, args.compress_stats)
     reactor.listenTCP(args.port, factory)
     print(f"Servidor IMAP corriendo en el puerto {args.port} con almacenamiento en '{args.storage}'", flush=True)
     reactor.run()
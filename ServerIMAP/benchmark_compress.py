@@ -0,0 +1,148 @@
+import argparse
+import re
+import socket
+import time
+import zlib
+
+# Una línea que termina en {n} anuncia un literal de n bytes.
+LiteralRe = re.compile(rb"\{(\d+)\}\r\n$")
+
+
+class IMAPBenchmarkSession:
+    def __init__(self, host, port, compress):
+        """
+        Abre una sesión IMAP de prueba, con o sin COMPRESS=DEFLATE.
+        Entradas: host, port, compress (True para activar COMPRESS DEFLATE)
+        Salidas: Ninguna
+        """
+        self.sock = socket.create_connection((host, port))
+        self.compress = compress
+        self.compressor = None
+        self.decompressor = None
+        self.buffer = b""
+        self.tagCount = 0
+        self.wireIn = 0
+        self.wireOut = 0
+        self.bytesIn = 0
+        self.bytesOut = 0
+        self.cpuTime = 0.0
+        self.readLine()
+
+    def send(self, data):
+        """
+        Envía datos al servidor, comprimiéndolos si DEFLATE está activo.
+        Entradas: data (bytes)
+        Salidas: Ninguna
+        """
+        self.bytesOut += len(data)
+        if self.compressor is not None:
+            start = time.process_time()
+            data = self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+            self.cpuTime += time.process_time() - start
+        self.wireOut += len(data)
+        self.sock.sendall(data)
+
+    def fill(self):
+        """
+        Lee del socket y agrega los bytes (descomprimidos si corresponde) al buffer.
+        Entradas: Ninguna
+        Salidas: Ninguna
+        """
+        data = self.sock.recv(65536)
+        if not data:
+            raise ConnectionError("El servidor cerró la conexión")
+        self.wireIn += len(data)
+        if self.decompressor is not None:
+            start = time.process_time()
+            data = self.decompressor.decompress(data)
+            self.cpuTime += time.process_time() - start
+        self.bytesIn += len(data)
+        self.buffer += data
+
+    def readLine(self):
+        """
+        Lee una línea completa de la respuesta del servidor.
+        Entradas: Ninguna
+        Salidas: la línea, incluyendo el CRLF
+        """
+        while b"\r\n" not in self.buffer:
+            self.fill()
+        line, self.buffer = self.buffer.split(b"\r\n", 1)
+        return line + b"\r\n"
+
+    def readBytes(self, size):
+        """
+        Lee exactamente size bytes de un literal.
+        Entradas: size
+        Salidas: Ninguna
+        """
+        while len(self.buffer) < size:
+            self.fill()
+        self.buffer = self.buffer[size:]
+
+    def command(self, line):
+        """
+        Envía un comando y lee la respuesta hasta la línea con su etiqueta.
+        Entradas: line (comando sin etiqueta)
+        Salidas: la línea de respuesta etiquetada
+        """
+        self.tagCount += 1
+        tag = b"b%d" % self.tagCount
+        self.send(tag + b" " + line + b"\r\n")
+        while True:
+            response = self.readLine()
+            literal = LiteralRe.search(response)
+            if literal:
+                self.readBytes(int(literal.group(1)))
+            elif response.startswith(tag + b" "):
+                if not response.startswith(tag + b" OK"):
+                    raise RuntimeError(response.decode("utf-8", errors="replace").strip())
+                return response
+
+    def run(self, user, password):
+        """
+        Ejecuta la sesión: LOGIN, COMPRESS opcional, SELECT, FETCH de todo el buzón y LOGOUT.
+        Entradas: user, password
+        Salidas: Ninguna
+        """
+        self.command(b"LOGIN " + user.encode() + b" " + password.encode())
+        if self.compress:
+            self.command(b"COMPRESS DEFLATE")
+            self.compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -zlib.MAX_WBITS)
+            self.decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+        self.command(b"SELECT INBOX")
+        self.command(b"FETCH 1:* (FLAGS BODY[HEADER.FIELDS (FROM TO SUBJECT DATE)])")
+        self.command(b"FETCH 1:* (BODY[])")
+        self.command(b"LOGOUT")
+        self.sock.close()
+
+
+def main():
+    """
+    Compara una sesión IMAP sin compresión y otra con COMPRESS=DEFLATE.
+    Entradas: Ninguna
+    Salidas: Imprime los bytes en la red y el CPU de cada sesión
+    """
+    parser = argparse.ArgumentParser(description="Benchmark de COMPRESS=DEFLATE para el servidor IMAP.")
+    parser.add_argument("--host", default="localhost", help="Servidor IMAP (default: localhost).")
+    parser.add_argument("-p", "--port", type=int, required=True, help="Puerto del servidor IMAP.")
+    parser.add_argument("-u", "--user", required=True, help="Usuario (usuario@dominio).")
+    parser.add_argument("-w", "--password", required=True, help="Contraseña del usuario.")
+    args = parser.parse_args()
+
+    for compress in (False, True):
+        session = IMAPBenchmarkSession(args.host, args.port, compress)
+        start = time.perf_counter()
+        cpuStart = time.process_time()
+        session.run(args.user, args.password)
+        elapsed = time.perf_counter() - start
+        cpu = time.process_time() - cpuStart
+        print(f"{'DEFLATE' if compress else 'Sin compresión'}: "
+              f"recibidos {session.bytesIn} bytes ({session.wireIn} en la red), "
+              f"enviados {session.bytesOut} bytes ({session.wireOut} en la red), "
+              f"CPU del cliente {cpu * 1000:.2f} ms (zlib {session.cpuTime * 1000:.2f} ms), "
+              f"tiempo {elapsed * 1000:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
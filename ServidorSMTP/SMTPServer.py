@@ -9,7 +9,8 @@ from twisted.mail.imap4 import LOGINCredentials, PLAINCredentials
 from twisted.cred.portal import IRealm
 from twisted.application import service
 from twisted.internet import reactor
-import os, time
+from twisted.python import log
+import os, time, uuid
 
 @implementer(smtp.IMessageDelivery)
 class ConsoleMessageDelivery:
@@ -55,6 +56,9 @@ class ConsoleMessageDelivery:
 
 @implementer(smtp.IMessage)
 class ConsoleMessage:
+    # Tamaño del buffer en memoria antes de escribirlo al disco.
+    WRITE_CHUNK_SIZE = 64 * 1024
+
     def __init__(self, storage_path, local_part, recipient_domain):
         """
         Inicializa el mensaje SMTP.
@@ -64,17 +68,46 @@ class ConsoleMessage:
         self.storage_path = storage_path
         self.local_part = local_part
         self.recipient_domain = recipient_domain
-        self.lines = []
+        self.buffer = bytearray()
+        self.tmp_file = None
+        self.tmp_path = None
 
     def lineReceived(self, line):
         """
-        Procesa cada línea del mensaje.
+        Procesa cada línea del mensaje recibida con DATA, sin decodificarla.
         Entradas: line (La linea del mensaje)
         Salidas: Ninguuna
         """
-        if isinstance(line, bytes):
-            line = line.decode('utf-8', errors='replace')
-        self.lines.append(line)
+        if isinstance(line, str):
+            line = line.encode('utf-8')
+        self.buffer += line
+        self.buffer += b"\r\n"
+        if len(self.buffer) >= self.WRITE_CHUNK_SIZE:
+            self.flush()
+
+    def chunkReceived(self, data):
+        """
+        Procesa un bloque de bytes del mensaje recibido con BDAT, tal como llega.
+        Entradas: data (bytes del mensaje)
+        Salidas: Ninguna
+        """
+        self.buffer += data
+        if len(self.buffer) >= self.WRITE_CHUNK_SIZE:
+            self.flush()
+
+    def flush(self):
+        """
+        Escribe el buffer en un archivo temporal, que se crea en la primera escritura.
+        Entradas: Ninguna
+        Salidas: Ninguna
+        """
+        if self.tmp_file is None:
+            os.makedirs(self.storage_path, exist_ok=True)
+            self.tmp_path = os.path.join(self.storage_path, f".{uuid.uuid4().hex}.part")
+            fd = os.open(self.tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+            self.tmp_file = os.fdopen(fd, "wb")
+        self.tmp_file.write(self.buffer)
+        self.buffer = bytearray()
 
     def eomReceived(self):
         """
@@ -82,18 +115,253 @@ class ConsoleMessage:
         Entradas: Ninguna
         Salidas: Deferred indicando finalización exitosa
         """
+        self.flush()
+        self.tmp_file.close()
         filename = f"{self.local_part}_{int(time.time())}.eml"
         directory_path = os.path.join(self.storage_path, self.recipient_domain, self.local_part)
         os.makedirs(directory_path, exist_ok=True)
         filepath = os.path.join(directory_path, filename)
-        with open(filepath, "w") as f:
-            f.write("\n".join(self.lines))
+        os.replace(self.tmp_path, filepath)
         print(f"Correo guardado en: {filepath}")
-        self.lines = None
+        self.buffer = None
+        self.tmp_file = None
+        self.tmp_path = None
         return defer.succeed(None)
 
+    def connectionLost(self):
+        """
+        Descarta el mensaje incompleto y elimina el archivo temporal.
+        Entradas: Ninguna
+        Salidas: Ninguna
+        """
+        if self.tmp_file is not None:
+            self.tmp_file.close()
+            os.remove(self.tmp_path)
+        self.buffer = None
+        self.tmp_file = None
+        self.tmp_path = None
+
+class ConsoleESMTP(smtp.ESMTP):
+    # Valores aceptados para el parámetro BODY= del comando MAIL.
+    BODY_TYPES = (b"7BIT", b"8BITMIME", b"BINARYMIME")
+
+    def __init__(self, *args, **kwargs):
+        """
+        Inicializa el protocolo ESMTP con soporte para CHUNKING (BDAT), 8BITMIME y BINARYMIME.
+        Entradas: args, kwargs (se pasan a smtp.ESMTP)
+        Salidas: Ninguna
+        """
+        super().__init__(*args, **kwargs)
+        self.bodyType = None
+        self.chunkMessages = None
+        self.chunkError = None
+        self.chunkRemaining = 0
+        self.chunkSize = 0
+        self.chunkLast = False
+
+    def extensions(self):
+        """
+        Retorna las extensiones anunciadas en la respuesta a EHLO.
+        Entradas: Ninguna
+        Salidas: diccionario con las extensiones
+        """
+        ext = super().extensions()
+        ext[b"8BITMIME"] = None
+        ext[b"BINARYMIME"] = None
+        ext[b"CHUNKING"] = None
+        return ext
+
+    def dataReceived(self, data):
+        """
+        Separa las líneas de comandos y entrega los bloques de BDAT como bytes sin procesar.
+        Entradas: data (bytes recibidos del socket)
+        Salidas: Ninguna
+        """
+        buf = self._buffer + data
+        pos = 0
+        while pos < len(buf) and not self.transport.disconnecting:
+            if self.chunkRemaining:
+                end = min(len(buf), pos + self.chunkRemaining)
+                self.resetTimeout()
+                self.chunkRemaining -= end - pos
+                self.chunkReceived(buf[pos:end])
+                pos = end
+                if not self.chunkRemaining:
+                    self.chunkDone()
+                continue
+            end = buf.find(self.delimiter, pos)
+            if end == -1:
+                break
+            line = buf[pos:end]
+            pos = end + len(self.delimiter)
+            if len(line) > self.MAX_LENGTH:
+                self._buffer = b""
+                return self.lineLengthExceeded(line)
+            self.lineReceived(line)
+        self._buffer = buf[pos:]
+        if len(self._buffer) > self.MAX_LENGTH:
+            return self.lineLengthExceeded(self._buffer)
+
+    def do_MAIL(self, rest):
+        """
+        Procesa MAIL FROM y guarda el tipo de cuerpo indicado con BODY=.
+        Entradas: rest (argumentos del comando)
+        Salidas: Ninguna
+        """
+        if self.chunkMessages is not None:
+            self.sendCode(503, b"BDAT transaction in progress")
+            return
+        m = self.mail_re.match(rest)
+        if m and not self._from:
+            bodyType = b"7BIT"
+            for opt in (m.group("opts") or b"").split():
+                key, _, value = opt.partition(b"=")
+                if key.upper() == b"BODY":
+                    bodyType = value.upper()
+            if bodyType not in self.BODY_TYPES:
+                self.sendCode(501, b"Unsupported BODY type")
+                return
+            self.bodyType = bodyType
+        super().do_MAIL(rest)
+
+    def do_DATA(self, rest):
+        """
+        Procesa DATA, rechazándolo si hay una transacción BDAT o el cuerpo es BINARYMIME.
+        Entradas: rest (argumentos del comando)
+        Salidas: Ninguna
+        """
+        if self.chunkMessages is not None:
+            self.sendCode(503, b"BDAT transaction in progress")
+            return
+        if self.bodyType == b"BINARYMIME" and self._from is not None:
+            self.sendCode(503, b"BINARYMIME requires BDAT")
+            return
+        super().do_DATA(rest)
+
+    def do_BDAT(self, rest):
+        """
+        Procesa BDAT <tamaño> [LAST] y prepara la lectura del bloque de bytes.
+        Entradas: rest (argumentos del comando)
+        Salidas: Ninguna
+        """
+        parts = rest.split()
+        if (not parts or len(parts) > 2 or not parts[0].isdigit()
+                or (len(parts) == 2 and parts[1].upper() != b"LAST")):
+            self.sendCode(501, b"Syntax error: BDAT <size> [LAST]")
+            return
+        if self.chunkMessages is None:
+            self.startChunking()
+        self.chunkSize = int(parts[0])
+        self.chunkLast = len(parts) == 2
+        self.chunkRemaining = self.chunkSize
+        if not self.chunkRemaining:
+            self.chunkDone()
+
+    def startChunking(self):
+        """
+        Inicia una transacción BDAT creando los mensajes de cada destinatario.
+        Entradas: Ninguna
+        Salidas: Ninguna
+        """
+        self.chunkMessages = []
+        if self._from is None or not self._to:
+            self.chunkError = smtp.SMTPServerError(503, b"Must have valid receiver and originator")
+            return
+        helo, origin, recipients = self._helo, self._from, self._to
+        self._from = None
+        self._to = []
+        for (user, msgFunc) in recipients:
+            try:
+                msg = msgFunc()
+                rcvdhdr = self.receivedHeader(helo, origin, [user])
+                if rcvdhdr:
+                    if isinstance(rcvdhdr, str):
+                        rcvdhdr = rcvdhdr.encode("utf-8")
+                    msg.chunkReceived(rcvdhdr + b"\r\n")
+                self.chunkMessages.append(msg)
+            except smtp.SMTPServerError as e:
+                self.chunkError = e
+                break
+            except BaseException:
+                log.err()
+                self.chunkError = smtp.SMTPServerError(550, b"Internal server error")
+                break
+        if self.chunkError:
+            self._disconnect(self.chunkMessages)
+            self.chunkMessages = []
+
+    def chunkReceived(self, data):
+        """
+        Entrega un bloque de bytes a todos los mensajes de la transacción.
+        Entradas: data (bytes del bloque)
+        Salidas: Ninguna
+        """
+        if self.chunkError:
+            return
+        try:
+            for message in self.chunkMessages:
+                message.chunkReceived(data)
+        except smtp.SMTPServerError as e:
+            self.chunkError = e
+            self._disconnect(self.chunkMessages)
+            self.chunkMessages = []
+
+    def chunkDone(self):
+        """
+        Responde al terminar un bloque BDAT y entrega el mensaje si era el último.
+        Entradas: Ninguna
+        Salidas: Ninguna
+        """
+        messages, error, last = self.chunkMessages, self.chunkError, self.chunkLast
+        if error:
+            # Un BDAT fallido termina la transacción (RFC 3030).
+            self._disconnect(messages)
+            self.resetChunking()
+            self.sendCode(error.code, error.resp)
+            return
+        if not last:
+            self.sendCode(250, b"%d octets received" % self.chunkSize)
+            return
+        self.resetChunking()
+        defer.DeferredList(
+            [m.eomReceived() for m in messages], consumeErrors=True
+        ).addCallback(self._messageHandled)
+
+    def resetChunking(self):
+        """
+        Descarta el estado de la transacción BDAT actual.
+        Entradas: Ninguna
+        Salidas: Ninguna
+        """
+        self.bodyType = None
+        self.chunkMessages = None
+        self.chunkError = None
+        self.chunkLast = False
+
+    def do_RSET(self, rest):
+        """
+        Procesa RSET, descartando también una transacción BDAT incompleta.
+        Entradas: rest (argumentos del comando)
+        Salidas: Ninguna
+        """
+        if self.chunkMessages:
+            self._disconnect(self.chunkMessages)
+        self.resetChunking()
+        super().do_RSET(rest)
+
+    def connectionLost(self, reason):
+        """
+        Descarta los mensajes BDAT incompletos al cerrarse la conexión.
+        Entradas: reason (razón del cierre)
+        Salidas: Ninguna
+        """
+        if self.chunkMessages:
+            self._disconnect(self.chunkMessages)
+        self.resetChunking()
+        super().connectionLost(reason)
+
 class ConsoleSMTPFactory(smtp.SMTPFactory):
-    protocol = smtp.ESMTP
+    protocol = ConsoleESMTP
 
     def __init__(self, portal, domains, mail_storage, *args, **kwargs):
         """